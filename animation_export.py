@@ -0,0 +1,231 @@
+import argparse
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import zlib
+
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+from visualization import PALETTE_RGB, downscale_grid, grid_to_rgb
+from rules_implementations import RULE_NAMES, DEFAULT_PARAMS
+from parallel_step import apply_rules_banded
+
+FORMATS = {
+    '.gif': 'gif',
+    '.png': 'apng',
+    '.apng': 'apng',
+    '.mp4': 'mp4',
+}
+
+_STOP = object()
+
+
+def simulation_frames(grid, selected_rules, params, steps, frame_skip=1, workers=1):
+    """Generator klatek (iteracja, grid) - liczy kolejne kroki symulacji w locie"""
+    frame_skip = max(1, frame_skip)
+    yield 0, grid
+    for i in range(1, steps + 1):
+        grid = apply_rules_banded(grid, selected_rules, params, workers)
+        if i % frame_skip == 0 or i == steps:
+            yield i, grid
+
+
+def _palette_image(grid, factor):
+    """Klatka w trybie 'P' - 1 bajt na komórkę, kolory z palety bez kwantyzacji"""
+    img = Image.fromarray(downscale_grid(grid, factor).astype(np.uint8), mode='P')
+    img.putpalette(PALETTE_RGB.tobytes())
+    return img
+
+
+def _drain(frame_queue):
+    """Zwraca klatki z kolejki aż do sygnału końca"""
+    while True:
+        item = frame_queue.get()
+        if item is _STOP:
+            # Sygnał zostaje w kolejce - kolejne _drain() też się zakończą
+            frame_queue.put(_STOP)
+            return
+        yield item
+
+
+def _encode_gif(frame_queue, path, fps, factor):
+    """GIF zapisywany klatka po klatce - w pamięci jest tylko bieżąca klatka"""
+    duration = int(round(1000 / fps))
+    with open(path, 'wb') as fp:
+        first = True
+        for grid in _drain(frame_queue):
+            img = _palette_image(grid, factor)
+            if first:
+                header, _ = GifImagePlugin.getheader(
+                    img, info={'loop': 0, 'duration': duration, 'optimize': False})
+                fp.write(b''.join(header))
+                first = False
+            fp.write(b''.join(GifImagePlugin.getdata(img, duration=duration)))
+        fp.write(b';')  # GIF trailer
+
+
+def _png_chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+
+def _encode_apng(frame_queue, path, fps, factor):
+    """
+    APNG zapisywany klatka po klatce (IDAT / fcTL + fdAT). Liczba klatek
+    w acTL jest znana dopiero na końcu, więc jest dopisywana w miejscu.
+    """
+    with open(path, 'wb') as fp:
+        seq = 0
+        frames = 0
+        actl_offset = None
+        for grid in _drain(frame_queue):
+            grid = downscale_grid(grid, factor).astype(np.uint8)
+            h, w = grid.shape
+            if actl_offset is None:
+                fp.write(b'\x89PNG\r\n\x1a\n')
+                # Obraz z paletą, 8 bitów na piksel
+                fp.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 3, 0, 0, 0)))
+                fp.write(_png_chunk(b'PLTE', PALETTE_RGB.tobytes()))
+                actl_offset = fp.tell()
+                fp.write(_png_chunk(b'acTL', struct.pack('>II', 0, 0)))
+
+            fp.write(_png_chunk(b'fcTL', struct.pack('>IIIIIHHBB', seq, w, h, 0, 0,
+                                                     1, fps, 0, 0)))
+            seq += 1
+            # Filtr 0 (None) na początku każdego wiersza
+            rows = np.hstack([np.zeros((h, 1), dtype=np.uint8), grid])
+            data = zlib.compress(rows.tobytes())
+            if frames == 0:
+                fp.write(_png_chunk(b'IDAT', data))
+            else:
+                fp.write(_png_chunk(b'fdAT', struct.pack('>I', seq) + data))
+                seq += 1
+            frames += 1
+
+        if actl_offset is None:
+            return
+        fp.write(_png_chunk(b'IEND', b''))
+        fp.seek(actl_offset)
+        fp.write(_png_chunk(b'acTL', struct.pack('>II', frames, 0)))
+
+
+def _encode_mp4(frame_queue, path, fps, factor):
+    """MP4 (H.264) - surowe klatki RGB strumieniowane do ffmpeg przez stdin"""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("Eksport MP4 wymaga programu 'ffmpeg' w PATH")
+
+    proc = None
+    try:
+        for grid in _drain(frame_queue):
+            rgb = grid_to_rgb(grid, factor)
+            # yuv420p wymaga parzystych wymiarów
+            h, w = rgb.shape[0] // 2 * 2, rgb.shape[1] // 2 * 2
+            if proc is None:
+                proc = subprocess.Popen(
+                    [ffmpeg, '-y', '-loglevel', 'error',
+                     '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{w}x{h}',
+                     '-r', str(fps), '-i', '-',
+                     '-c:v', 'libx264', '-pix_fmt', 'yuv420p', path],
+                    stdin=subprocess.PIPE,
+                )
+            proc.stdin.write(np.ascontiguousarray(rgb[:h, :w]).tobytes())
+    finally:
+        if proc is not None:
+            proc.stdin.close()
+            if proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg zakończył się kodem {proc.returncode}")
+
+
+def export_animation(frames, path, fmt=None, fps=10, downscale=1, queue_size=8,
+                     on_frame=None):
+    """
+    Zapisuje animację z klatek (iteracja, grid) do pliku GIF / APNG / MP4.
+    Kodowanie działa w osobnym wątku; kolejka ma maks. queue_size klatek,
+    więc symulacja czeka, gdy enkoder nie nadąża.
+    """
+    if fmt is None:
+        ext = path[path.rfind('.'):].lower()
+        if ext not in FORMATS:
+            raise ValueError(f"Nieznany format pliku: {path}")
+        fmt = FORMATS[ext]
+    if fmt not in ('gif', 'apng', 'mp4'):
+        raise ValueError(f"Nieznany format: {fmt}")
+
+    frame_queue = queue.Queue(maxsize=queue_size)
+    errors = []
+    failed = threading.Event()
+
+    def worker():
+        try:
+            if fmt == 'gif':
+                _encode_gif(frame_queue, path, fps, downscale)
+            elif fmt == 'apng':
+                _encode_apng(frame_queue, path, fps, downscale)
+            else:
+                _encode_mp4(frame_queue, path, fps, downscale)
+        except BaseException as e:
+            errors.append(e)
+            failed.set()
+            # Nie blokuj producenta, który czeka na miejsce w kolejce
+            for _ in _drain(frame_queue):
+                pass
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+
+    count = 0
+    try:
+        for iteration, grid in frames:
+            # Po błędzie enkodera nie ma sensu liczyć dalszych kroków
+            if failed.is_set():
+                break
+            # Kopia - generator może dalej modyfikować swój grid
+            frame_queue.put(grid.copy())
+            count += 1
+            if on_frame is not None:
+                on_frame(iteration)
+    finally:
+        frame_queue.put(_STOP)
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Eksport animacji symulacji CA")
+    parser.add_argument('--grid', default='krakow_grid.npy', help="Plik .npy z gridem")
+    parser.add_argument('--rule', action='append', dest='rules', choices=RULE_NAMES,
+                        required=True, help="Reguła (można podać wiele razy, w kolejności)")
+    parser.add_argument('--param', action='append', default=[], metavar='KLUCZ=WARTOŚĆ',
+                        help="Parametr reguły, np. res_low_threshold=4")
+    parser.add_argument('--steps', type=int, default=100, help="Liczba iteracji")
+    parser.add_argument('--frame-skip', type=int, default=1, help="Zapisuj co N-tą iterację")
+    parser.add_argument('--downscale', type=int, default=1, help="Zmniejszenie gridu N razy")
+    parser.add_argument('--fps', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=1,
+                        help="Liczba wątków na krok (pasy wierszy)")
+    parser.add_argument('-o', '--output', required=True, help="Plik wyjściowy (.gif/.png/.apng/.mp4)")
+    args = parser.parse_args()
+
+    params = dict(DEFAULT_PARAMS)
+    for item in args.param:
+        key, _, value = item.partition('=')
+        if key not in DEFAULT_PARAMS:
+            parser.error(f"Nieznany parametr: {key}")
+        params[key] = float(value) if '.' in value else int(value)
+
+    grid = np.load(args.grid)
+    frames = simulation_frames(grid, args.rules, params, args.steps, args.frame_skip,
+                               args.threads)
+    count = export_animation(frames, args.output, fps=args.fps, downscale=args.downscale)
+    print(f"✅ Zapisano {count} klatek do {args.output}")
+
+
+if __name__ == '__main__':
+    main()
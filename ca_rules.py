@@ -54,13 +54,13 @@ def rule_commercial_roads(grid, res_threshold=2):
     new_grid[can_change & should_change] = 3
     return new_grid
 
-def rule_suburban_sprawl(grid, center_distance=80):
+def rule_suburban_sprawl(grid, center_distance=80, row_offset=0, total_rows=None):
     """
     Suburbanizacja: Empty daleko od centrum + ≥2 sąsiadów Res Low → Res Low
     """
     new_grid = grid.copy()
     
-    distances = distance_from_center(grid)
+    distances = distance_from_center(grid, row_offset, total_rows)
     neighbors = count_neighbors(grid, 1)
     
     can_change = (grid == 0)  # Tylko Empty
@@ -83,13 +83,13 @@ def rule_park_pressure(grid, threshold=6):
     new_grid[can_change & should_change] = 1
     return new_grid
 
-def rule_industrial_periphery(grid):
+def rule_industrial_periphery(grid, row_offset=0, total_rows=None):
     """
     Industrializacja: Empty daleko od centrum + blisko Roads → Industrial
     """
     new_grid = grid.copy()
     
-    distances = distance_from_center(grid)
+    distances = distance_from_center(grid, row_offset, total_rows)
     near_roads = is_near_type(grid, 7, max_distance=2)
     
     can_change = (grid == 0)  # Tylko Empty
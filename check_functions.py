@@ -27,11 +27,16 @@ def is_near_type(grid, target_type, max_distance=3):
         mask = binary_dilation(mask)
     return mask
 
-def distance_from_center(grid):
-    """Oblicza dystans każdej komórki od centrum gridu"""
+def distance_from_center(grid, row_offset=0, total_rows=None):
+    """
+    Oblicza dystans każdej komórki od centrum gridu.
+    Dla pasa wierszy: row_offset - pierwszy wiersz pasa, total_rows - wiersze całego gridu
+    """
     rows, cols = grid.shape
-    center_row, center_col = rows // 2, cols // 2
+    if total_rows is None:
+        total_rows = rows
+    center_row, center_col = total_rows // 2, cols // 2
     
-    row_indices, col_indices = np.ogrid[:rows, :cols]
+    row_indices, col_indices = np.ogrid[row_offset:row_offset + rows, :cols]
     distances = np.sqrt((row_indices - center_row)**2 + (col_indices - center_col)**2)
     return distances
@@ -0,0 +1,157 @@
+import os
+import struct
+
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+
+from visualization import PALETTE_RGB
+
+# Format binarny (little-endian), wiadomość = sklejone ramki:
+#   nagłówek  <BIIIII  rodzaj, seq, base, rows, cols, count
+#   count liczb varint (LEB128), potem count bajtów klas
+# KEYFRAME: varinty to długości serii (RLE po spłaszczonym gridzie), bajty - klasy serii
+# DELTA:    varinty to odstępy między kolejnymi indeksami zmienionych komórek
+#           (pierwszy - indeks bezwzględny), bajty - nowe klasy; obowiązuje po ramce `base`
+# SYNC:     bez danych - informuje tylko o aktualnym seq
+KEYFRAME, DELTA, SYNC = 0, 1, 2
+_HEADER = struct.Struct('<BIIIII')
+
+_component = components.declare_component(
+    'grid_canvas',
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'grid_canvas'),
+)
+
+
+def _encode_varints(values):
+    """Koduje tablicę nieujemnych liczb jako LEB128 (bez pętli po elementach)"""
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return b''
+    nbytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        nbytes += rest > 0
+        rest >>= np.uint64(7)
+
+    pos = np.arange(nbytes.max())
+    chunks = (values[:, None] >> (np.uint64(7) * pos.astype(np.uint64))) & np.uint64(0x7F)
+    chunks |= np.where(pos < (nbytes - 1)[:, None], np.uint64(0x80), np.uint64(0))
+    return chunks[pos < nbytes[:, None]].astype(np.uint8).tobytes()
+
+
+def _decode_varints(data, offset, count):
+    """Odczytuje count liczb LEB128 od offset - zwraca (tablica, nowy offset)"""
+    if count == 0:
+        return np.zeros(0, dtype=np.int64), offset
+    raw = np.frombuffer(data, dtype=np.uint8, offset=offset)
+    ends = np.flatnonzero(raw < 0x80)[:count]
+    raw = raw[:ends[-1] + 1].astype(np.uint64)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    pos = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    parts = (raw & np.uint64(0x7F)) << (np.uint64(7) * pos.astype(np.uint64))
+    return np.add.reduceat(parts, starts).astype(np.int64), offset + len(raw)
+
+
+def _frame(kind, seq, base, shape, varints, classes):
+    header = _HEADER.pack(kind, seq, base, shape[0], shape[1], len(classes))
+    return header + _encode_varints(varints) + np.asarray(classes, dtype=np.uint8).tobytes()
+
+
+def encode_keyframe(grid, seq):
+    """Pełny stan gridu (RLE)"""
+    flat = grid.ravel()
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    lengths = np.diff(np.append(starts, flat.size))
+    return _frame(KEYFRAME, seq, 0, grid.shape, lengths, flat[starts])
+
+
+def encode_delta(old_grid, new_grid, seq, base):
+    """Tylko zmienione komórki względem ramki base"""
+    idx = np.flatnonzero(old_grid.ravel() != new_grid.ravel())
+    gaps = np.diff(idx, prepend=0)
+    return _frame(DELTA, seq, base, new_grid.shape, gaps, new_grid.ravel()[idx])
+
+
+def encode_sync(seq, shape):
+    return _frame(SYNC, seq, seq, shape, [], [])
+
+
+def decode_frames(data, grid=None, seq=None):
+    """
+    Dekoder referencyjny (ten sam algorytm co frontend) - nakłada ramki
+    na grid w stanie seq i zwraca (grid, ostatni seq). Rzuca ValueError,
+    gdy delta nie pasuje do stanu.
+    """
+    offset = 0
+    while offset < len(data):
+        kind, frame_seq, base, rows, cols, count = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        varints, offset = _decode_varints(data, offset, count)
+        classes = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset)
+        offset += count
+
+        if kind == KEYFRAME:
+            grid = np.repeat(classes, varints).reshape(rows, cols)
+        elif kind == DELTA:
+            if grid is None or base != seq:
+                raise ValueError(f"Ramka {frame_seq} wymaga stanu {base}, jest {seq}")
+            grid = grid.copy()
+            grid.ravel()[np.cumsum(varints)] = classes
+        seq = frame_seq
+    return grid, seq
+
+
+class FrameStream:
+    """
+    Stan transmisji po stronie serwera: ostatni wysłany grid, numer ramki
+    i ramki czekające na wysłanie w bieżącym przebiegu skryptu.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.last = None
+        self.pending = []
+        self.handled_resync = None
+
+    def push(self, grid, keyframe=False):
+        """Dodaje stan gridu - jako deltę, albo keyframe gdy delta nic nie daje"""
+        self.seq += 1
+        frame = None
+        if not keyframe and self.last is not None and self.last.shape == grid.shape:
+            frame = encode_delta(self.last, grid, self.seq, self.seq - 1)
+        # RLE liczony tylko dla dużych zmian - mała delta zawsze jest mniejsza
+        if frame is None or len(frame) > grid.size // 8:
+            key = encode_keyframe(grid, self.seq)
+            if frame is None or len(key) < len(frame):
+                frame = key
+        self.pending.append(frame)
+        self.last = grid
+
+    def sync(self, grid):
+        """Keyframe, jeśli grid nie pochodzi z push() (np. po Reset)"""
+        if grid is not self.last:
+            self.push(grid, keyframe=True)
+
+    def flush(self):
+        payload = b''.join(self.pending)
+        if not payload:
+            payload = encode_sync(self.seq, self.last.shape)
+        self.pending = []
+        return payload
+
+
+def grid_canvas(stream, grid, interval_ms, key='grid_canvas'):
+    """
+    Wyświetla grid w komponencie canvas. Przeglądarka trzyma własną kopię
+    gridu i dostaje tylko ramki z tego przebiegu; gdy zgubi ciąg ramek,
+    prosi o keyframe (wartość komponentu {'resync': id} - id unikalne
+    dla każdej prośby, także między kolejnymi iframe).
+    """
+    value = st.session_state.get(key)
+    if value and value.get('resync') != stream.handled_resync:
+        stream.handled_resync = value['resync']
+        stream.push(grid, keyframe=True)
+    stream.sync(grid)
+    _component(payload=stream.flush(), palette=PALETTE_RGB.tolist(),
+               interval_ms=int(interval_ms), key=key, default=None)
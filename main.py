@@ -1,8 +1,16 @@
 import streamlit as st
 import numpy as np
 import time
+import math
+import os
+import tempfile
 from visualization import *
 from rules_implementations import *
+from animation_export import simulation_frames, export_animation
+from simulation_service import ServiceClient, DEFAULT_URL
+from viewport import TilePyramid, viewport_bounds
+from frame_transport import FrameStream, grid_canvas
+from parallel_step import apply_rules_banded
 
 st.set_page_config(layout="wide", page_title="Cellular Automaton - Kraków")
 
@@ -22,6 +30,19 @@ def load_initial_grid():
 
 initial_grid = load_initial_grid()
 
+@st.cache_resource
+def initial_pyramid():
+    return TilePyramid(initial_grid)
+
+# Stan początkowy się nie zmienia - obraz liczony raz dla danego widoku
+# (canvas i widok kafelkowy przebiegają skrypt co krok / porcję kroków).
+# Kluczem jest okno widoku, więc pamiętane jest tylko kilka ostatnich.
+@st.cache_data(max_entries=16)
+def initial_image(bounds=None):
+    if bounds is not None:
+        return initial_pyramid().render(*bounds)
+    return create_visualization(initial_grid, 0).getvalue()
+
 # Inicjalizacja session state
 if 'current_grid' not in st.session_state:
     st.session_state.current_grid = initial_grid.copy()
@@ -131,6 +152,11 @@ animation_speed = st.sidebar.slider(
     step=0.05
 )
 
+threads = st.sidebar.number_input(
+    "Wątki obliczeń", min_value=1, max_value=os.cpu_count() or 1, value=1,
+    help="Krok liczony równolegle na pasach wierszy (dla dużych gridów)"
+)
+
 col_buttons = st.sidebar.columns(2)
 run_button = col_buttons[0].button("▶️ Run", use_container_width=True)
 reset_button = col_buttons[1].button("🔄 Reset", use_container_width=True)
@@ -138,14 +164,45 @@ reset_button = col_buttons[1].button("🔄 Reset", use_container_width=True)
 if reset_button:
     st.session_state.current_grid = initial_grid.copy()
     st.session_state.iteration = 0
+    st.session_state.pending_steps = 0
     st.rerun()
 
+# Widok (piramida kafelków dla dużych gridów)
+st.sidebar.markdown("---")
+st.sidebar.markdown("**🔍 Widok:**")
+render_mode = st.sidebar.radio(
+    "Renderowanie",
+    ["Obraz", "Widok kafelkowy", "Canvas (delta)"],
+    index=1 if max(initial_grid.shape) > 1000 else 0,
+    help="Obraz: pełna wizualizacja | Kafelkowy: tylko widoczny fragment z piramidy | "
+         "Canvas: przeglądarka trzyma grid i dostaje tylko zmienione komórki"
+)
+use_viewport = render_mode == "Widok kafelkowy"
+use_canvas = render_mode == "Canvas (delta)"
+if use_viewport:
+    zoom = st.sidebar.slider("Powiększenie", 1.0, 32.0, 1.0, step=0.5)
+    center_col = st.sidebar.slider("Środek W → E", 0.0, 1.0, 0.5, step=0.01)
+    center_row = st.sidebar.slider("Środek N → S", 0.0, 1.0, 0.5, step=0.01)
+
+    # Piramida odpowiada zawsze aktualnemu gridowi (po Reset / wczytaniu wyniku - od nowa)
+    pyramid = st.session_state.get('pyramid')
+    if pyramid is None or pyramid.levels[0] is not st.session_state.current_grid:
+        st.session_state.pyramid = TilePyramid(st.session_state.current_grid)
+
+
+def render_state(grid, iteration):
+    """Obraz stanu symulacji - widok kafelkowy albo pełna wizualizacja"""
+    if use_viewport:
+        bounds = viewport_bounds(grid.shape, zoom, center_row, center_col)
+        return st.session_state.pyramid.render(*bounds)
+    return create_visualization(grid, iteration)
+
+
 # Statystyki
 st.sidebar.markdown("---")
 st.sidebar.markdown(f"**Iteracja:** {st.session_state.iteration}")
 
-for i, name in enumerate(['Empty', 'Res Low', 'Res High', 'Commercial', 
-                          'Industrial', 'Parks', 'Water', 'Roads']):
+for i, name in enumerate(NAMES):
     count = np.sum(st.session_state.current_grid == i)
     if count > 0:
         pct = (count / st.session_state.current_grid.size) * 100
@@ -164,7 +221,11 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("🗺️ Początkowy stan")
-    initial_img = create_visualization(initial_grid, 0)
+    if use_viewport:
+        initial_img = initial_image(viewport_bounds(initial_grid.shape, zoom,
+                                                    center_row, center_col))
+    else:
+        initial_img = initial_image()
     st.image(initial_img, use_container_width=True)
 
 with col2:
@@ -172,9 +233,11 @@ with col2:
     image_placeholder = st.empty()
     stats_placeholder = st.empty()
 
-# Wyświetl aktualny stan
-current_img = create_visualization(st.session_state.current_grid, st.session_state.iteration)
-image_placeholder.image(current_img, use_container_width=True)
+# Wyświetl aktualny stan (canvas i widok kafelkowy rysowane niżej, raz na przebieg)
+chunked = use_canvas or use_viewport
+if not chunked:
+    current_img = render_state(st.session_state.current_grid, st.session_state.iteration)
+    image_placeholder.image(current_img, use_container_width=True)
 
 res_low_count = np.sum(st.session_state.current_grid == 1)
 total_cells = st.session_state.current_grid.size
@@ -182,20 +245,73 @@ res_low_pct = (res_low_count / total_cells) * 100
 stats_placeholder.info(f"**Iteracja {st.session_state.iteration}** | Res Low: {res_low_count} ({res_low_pct:.1f}%)")
 
 # Animacja
-if run_button and len(selected_rules) > 0:
+if chunked:
+    # Kroki liczone w kolejnych przebiegach skryptu - zmiana suwaków (zoom,
+    # przesunięcie) przerywa tylko bieżący przebieg, symulacja idzie dalej.
+    # Canvas: komponent z kluczem można wywołać raz na przebieg, więc liczona
+    # jest porcja kroków na ~0.5 s odtwarzania, a przeglądarka odtwarza ramki
+    # w tempie animation_speed. Widok kafelkowy: jeden krok na przebieg.
+    # Kolejny przebieg startuje dopiero, gdy porcja zostanie odtworzona -
+    # serwer nie wyprzedza przeglądarki, a statystyki opisują widoczny stan.
+    if run_button and len(selected_rules) > 0:
+        st.session_state.pending_steps = iterations
+        st.session_state.pending_total = iterations
+    if use_canvas:
+        stream = st.session_state.setdefault('frame_stream', FrameStream())
+    pending = st.session_state.get('pending_steps', 0)
+
+    chunk_start = time.time()
+    max_steps = math.ceil(0.5 / animation_speed) if use_canvas else 1
+    done = 0
+    while pending > 0 and done < max_steps:
+        st.session_state.current_grid = apply_rules_banded(
+            st.session_state.current_grid,
+            selected_rules,
+            params,
+            threads
+        )
+        st.session_state.iteration += 1
+        if use_canvas:
+            stream.push(st.session_state.current_grid)
+        else:
+            st.session_state.pyramid.update(st.session_state.current_grid)
+        pending -= 1
+        done += 1
+        if time.time() - chunk_start >= 0.5:
+            break
+    st.session_state.pending_steps = pending
+
+    if use_canvas:
+        with image_placeholder:
+            grid_canvas(stream, st.session_state.current_grid, animation_speed * 1000)
+    else:
+        current_img = render_state(st.session_state.current_grid, st.session_state.iteration)
+        image_placeholder.image(current_img, use_container_width=True)
+
+    res_low_count = np.sum(st.session_state.current_grid == 1)
+    res_low_pct = (res_low_count / total_cells) * 100
+    stats_placeholder.info(f"**Iteracja {st.session_state.iteration}** | Res Low: {res_low_count} ({res_low_pct:.1f}%)")
+
+    if pending > 0:
+        st.sidebar.progress(1 - pending / st.session_state.pending_total)
+        time.sleep(max(0, chunk_start + done * animation_speed - time.time()))
+        st.rerun()
+
+elif run_button and len(selected_rules) > 0:
     progress_bar = st.sidebar.progress(0)
     
     for i in range(iterations):
         # Aplikuj reguły
-        st.session_state.current_grid = apply_rules(
+        st.session_state.current_grid = apply_rules_banded(
             st.session_state.current_grid, 
             selected_rules, 
-            params
+            params,
+            threads
         )
         st.session_state.iteration += 1
         
         # Aktualizuj obraz
-        current_img = create_visualization(st.session_state.current_grid, st.session_state.iteration)
+        current_img = render_state(st.session_state.current_grid, st.session_state.iteration)
         image_placeholder.image(current_img, use_container_width=True)
         
         # Statystyki
@@ -212,6 +328,100 @@ if run_button and len(selected_rules) > 0:
     progress_bar.empty()
     st.rerun()
 
+# Eksport animacji
+st.sidebar.markdown("---")
+with st.sidebar.expander("🎞️ Eksport animacji"):
+    export_format = st.selectbox("Format", ["gif", "apng", "mp4"])
+    export_steps = st.number_input("Liczba iteracji", 1, 5000, 100, key="export_steps")
+    export_skip = st.number_input("Zapisuj co N-tą iterację", 1, 100, 1)
+    export_downscale = st.number_input("Zmniejszenie gridu (x)", 1, 16, 1)
+    export_fps = st.slider("FPS", 1, 30, 10)
+    export_button = st.button("💾 Eksportuj", use_container_width=True,
+                              disabled=len(selected_rules) == 0)
+
+if export_button:
+    suffix = {"gif": ".gif", "apng": ".png", "mp4": ".mp4"}[export_format]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        export_path = tmp.name
+
+    export_progress = st.sidebar.progress(0)
+    frames = simulation_frames(st.session_state.current_grid, selected_rules, params,
+                               export_steps, export_skip, threads)
+    try:
+        export_animation(frames, export_path, fmt=export_format, fps=export_fps,
+                         downscale=export_downscale,
+                         on_frame=lambda it: export_progress.progress(it / export_steps))
+    except RuntimeError as e:
+        st.sidebar.error(f"❌ {e}")
+    else:
+        with open(export_path, 'rb') as f:
+            st.sidebar.download_button("⬇️ Pobierz animację", f.read(),
+                                       file_name=f"ca_animation{suffix}",
+                                       use_container_width=True)
+    finally:
+        os.remove(export_path)
+    export_progress.empty()
+
+# Zadania w tle (serwis simulation_service.py)
+# Lista zadań pobierana tylko na żądanie (Odśwież, wysłanie, anulowanie, zmiana
+# adresu) - panel nie spowalnia przebiegów animacji. Fragment: kliknięcie
+# w panelu przebiega tylko panel, nie cały skrypt.
+def fetch_jobs(service):
+    try:
+        st.session_state.service_jobs = service.jobs()
+    except (OSError, RuntimeError, ValueError):
+        st.session_state.service_jobs = None
+
+
+@st.fragment
+def jobs_panel():
+    url = st.text_input("Adres serwisu", DEFAULT_URL)
+    service = ServiceClient(url, timeout=1)
+    if st.session_state.get('service_url') != url:
+        st.session_state.service_url = url
+        fetch_jobs(service)
+
+    if st.button("🔄 Odśwież", use_container_width=True):
+        fetch_jobs(service)
+    jobs = st.session_state.service_jobs
+    if jobs is None:
+        st.caption("Serwis niedostępny - uruchom `python simulation_service.py`")
+        return
+
+    job_steps = st.number_input("Liczba iteracji", 1, 100000, 500, key="job_steps")
+    job_priority = st.number_input("Priorytet", -10, 10, 0)
+    if st.button("📤 Wyślij zadanie", use_container_width=True,
+                 disabled=len(selected_rules) == 0):
+        try:
+            job_id = service.submit(st.session_state.current_grid, selected_rules, params,
+                                    job_steps, job_priority)
+        except (OSError, RuntimeError) as e:
+            st.error(f"❌ {e}")
+        else:
+            st.session_state.setdefault('job_base_iteration', {})[job_id] = st.session_state.iteration
+            fetch_jobs(service)
+            jobs = st.session_state.service_jobs or []
+
+    for job in jobs:
+        st.caption(f"`{job['id']}` {job['status']} - {job['progress']}/{job['steps']} "
+                   f"(priorytet {job['priority']})")
+        if job['status'] in ('queued', 'running'):
+            if st.button("⏹️ Anuluj", key=f"cancel_{job['id']}"):
+                service.cancel(job['id'])
+                fetch_jobs(service)
+                st.rerun()
+        elif job['status'] == 'done':
+            if st.button("📥 Wczytaj wynik", key=f"load_{job['id']}"):
+                base = st.session_state.get('job_base_iteration', {}).get(job['id'], 0)
+                st.session_state.current_grid = service.result(job['id'])
+                st.session_state.iteration = base + job['steps']
+                st.rerun()
+
+
+st.sidebar.markdown("---")
+with st.sidebar.expander("🗂️ Zadania w tle"):
+    jobs_panel()
+
 # Info
 st.markdown("---")
 st.info("""
@@ -0,0 +1,77 @@
+import inspect
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from rules_implementations import RULES, rule_args, apply_rules
+
+# Poniżej tylu wierszy na wątek podział nie ma sensu - liczymy szeregowo
+MIN_BAND_ROWS = 64
+
+_executors = {}
+# Streamlit przebiega skrypt każdej sesji w osobnym wątku
+_executors_lock = threading.Lock()
+
+
+def _executor(workers):
+    """Pula wątków współdzielona między krokami (jedna na liczbę wątków)"""
+    with _executors_lock:
+        if workers not in _executors:
+            _executors[workers] = ThreadPoolExecutor(max_workers=workers,
+                                                     thread_name_prefix='ca-band')
+        return _executors[workers]
+
+
+def _uses_position(rule):
+    """Czy reguła zależy od położenia komórki (dystans od centrum)"""
+    return 'row_offset' in inspect.signature(rule).parameters
+
+
+def _run_band(rule, args, src, dst, start, stop, halo, position):
+    """
+    Liczy regułę dla wierszy [start, stop) na pasie z zakładką halo
+    i zapisuje wynik bez zakładki do dst
+    """
+    rows = src.shape[0]
+    lo, hi = max(0, start - halo), min(rows, stop + halo)
+    kwargs = {'row_offset': lo, 'total_rows': rows} if position else {}
+    band = rule(src[lo:hi], *args, **kwargs)
+    dst[start:stop] = band[start - lo:stop - lo]
+
+
+def apply_rules_banded(grid, selected_rules, params, workers=None):
+    """
+    Aplikuje reguły jak apply_rules, ale każdą regułę liczy równolegle
+    na poziomych pasach wierszy (wątki - NumPy/SciPy zwalniają GIL).
+    Pas dostaje zakładkę równą zasięgowi reguły, więc wynik jest
+    identyczny z wersją szeregową.
+    """
+    workers = workers or os.cpu_count() or 1
+    rows = grid.shape[0]
+    if workers <= 1 or rows < 2 * MIN_BAND_ROWS:
+        return apply_rules(grid, selected_rules, params)
+
+    n_bands = min(workers, rows // MIN_BAND_ROWS)
+    bounds = np.linspace(0, rows, n_bands + 1).astype(int)
+    executor = _executor(workers)
+
+    # Dwa bufory na zmianę: reguła czyta z jednego i zapisuje pasy do drugiego
+    buffers = [np.empty_like(grid), np.empty_like(grid)]
+    src = grid
+    for rule_name in selected_rules:
+        if rule_name not in RULES:
+            continue
+        rule, _, halo = RULES[rule_name]
+        args = rule_args(rule_name, params)
+        position = _uses_position(rule)
+        dst = buffers[1] if src is buffers[0] else buffers[0]
+
+        futures = [executor.submit(_run_band, rule, args, src, dst, start, stop, halo, position)
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        for future in futures:
+            future.result()
+        src = dst
+
+    return grid.copy() if src is grid else src
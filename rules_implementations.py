@@ -1,25 +1,42 @@
 from ca_rules import *
 
+# Nazwa reguły → (funkcja, klucz parametru w params lub None, zasięg sąsiedztwa w wierszach)
+# Zasięg to promień stencila reguły - tyle wierszy zakładki potrzebuje tryb pasowy
+RULES = {
+    "Ekspansja Res Low": (rule_res_low_expansion, 'res_low_threshold', 1),
+    "Gęsta zabudowa": (rule_high_density, 'high_density_threshold', 1),
+    "Gentryfikacja": (rule_gentrification, 'gentrif_threshold', 1),
+    "Komercja wzdłuż dróg": (rule_commercial_roads, 'commercial_threshold', 1),
+    "Suburbanizacja": (rule_suburban_sprawl, 'suburban_distance', 1),
+    "Presja na parki": (rule_park_pressure, 'park_threshold', 1),
+    "Industrializacja peryferii": (rule_industrial_periphery, None, 2),
+    "Degradacja miejska": (rule_urban_decay, None, 1),
+}
+
+RULE_NAMES = list(RULES)
+
+# Domyślne wartości parametrów (te same co domyślne suwaki w main.py)
+DEFAULT_PARAMS = {
+    'res_low_threshold': 3,
+    'high_density_threshold': 5,
+    'gentrif_threshold': 4,
+    'commercial_threshold': 2,
+    'suburban_distance': 80,
+    'park_threshold': 6,
+}
+
+def rule_args(rule_name, params):
+    """Argumenty pozycyjne reguły (próg / dystans) z params"""
+    _, param_key, _ = RULES[rule_name]
+    return () if param_key is None else (params[param_key],)
+
 def apply_rules(grid, selected_rules, params):
     """Aplikuje wybrane reguły do gridu"""
     new_grid = grid.copy()
     
     for rule_name in selected_rules:
-        if rule_name == "Ekspansja Res Low":
-            new_grid = rule_res_low_expansion(new_grid, params['res_low_threshold'])
-        elif rule_name == "Gęsta zabudowa":
-            new_grid = rule_high_density(new_grid, params['high_density_threshold'])
-        elif rule_name == "Gentryfikacja":
-            new_grid = rule_gentrification(new_grid, params['gentrif_threshold'])
-        elif rule_name == "Komercja wzdłuż dróg":
-            new_grid = rule_commercial_roads(new_grid, params['commercial_threshold'])
-        elif rule_name == "Suburbanizacja":
-            new_grid = rule_suburban_sprawl(new_grid, params['suburban_distance'])
-        elif rule_name == "Presja na parki":
-            new_grid = rule_park_pressure(new_grid, params['park_threshold'])
-        elif rule_name == "Industrializacja peryferii":
-            new_grid = rule_industrial_periphery(new_grid)
-        elif rule_name == "Degradacja miejska":
-            new_grid = rule_urban_decay(new_grid)
+        if rule_name in RULES:
+            rule = RULES[rule_name][0]
+            new_grid = rule(new_grid, *rule_args(rule_name, params))
     
     return new_grid
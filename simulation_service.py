@@ -0,0 +1,409 @@
+import argparse
+import base64
+import heapq
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.managers import SyncManager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from rules_implementations import RULE_NAMES, DEFAULT_PARAMS, apply_rules
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_URL = os.environ.get('CA_SERVICE_URL', f'http://{DEFAULT_HOST}:{DEFAULT_PORT}')
+
+# Statusy zadań
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+# Zadanie przerwane zatrzymaniem serwisu - nie jest końcowe, wraca do kolejki
+INTERRUPTED = 'interrupted'
+
+
+def _npy_to_bytes(grid):
+    buf = io.BytesIO()
+    np.save(buf, grid)
+    return buf.getvalue()
+
+
+def _ignore_sigint():
+    """Procesy potomne ignorują Ctrl+C - zatrzymaniem steruje proces główny"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _run_job(input_path, result_path, selected_rules, params, steps, progress, cancel, stop,
+             job_id):
+    """Wykonuje symulację w procesie roboczym - zwraca status"""
+    grid = np.load(input_path)
+    for i in range(steps):
+        if stop.is_set():
+            return INTERRUPTED
+        if cancel.is_set():
+            return CANCELLED
+        grid = apply_rules(grid, selected_rules, params)
+        progress[job_id] = i + 1
+    np.save(result_path, grid)
+    return DONE
+
+
+class JobManager:
+    """
+    Kolejka zadań z priorytetem (wyższy = wcześniej) i pulą procesów.
+    Każde zadanie ma w results_dir plik <id>.json (opis i status),
+    <id>_input.npy (grid wejściowy) i po zakończeniu <id>.npy (wynik).
+    """
+
+    def __init__(self, results_dir='jobs', max_workers=None):
+        self.results_dir = results_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        os.makedirs(results_dir, exist_ok=True)
+
+        # spawn zamiast fork - procesy startują leniwie z wątku schedulera,
+        # gdy działają już wątki HTTP i połączenie z managerem
+        ctx = multiprocessing.get_context('spawn')
+        self._manager = SyncManager(ctx=ctx)
+        self._manager.start(_ignore_sigint)
+        self._progress = self._manager.dict()
+        self._cancel = {}
+        self._stop = self._manager.Event()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx,
+                                             initializer=_ignore_sigint)
+
+        self._jobs = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._running = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._load_existing()
+        self._scheduler = threading.Thread(target=self._schedule, daemon=True)
+        self._scheduler.start()
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.results_dir, f'{job_id}{suffix}')
+
+    def _save(self, job):
+        tmp = self._path(job['id'], '.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._path(job['id'], '.json'))
+
+    def _load_existing(self):
+        """Wczytuje zadania z dysku; niedokończone wracają do kolejki w kolejności zgłoszenia"""
+        jobs = []
+        for name in os.listdir(self.results_dir):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(self.results_dir, name), encoding='utf-8') as f:
+                jobs.append(json.load(f))
+        for job in sorted(jobs, key=lambda j: j['submitted']):
+            if job['status'] not in FINISHED:
+                job['status'] = QUEUED
+                job['progress'] = 0
+                job['started'] = None
+                self._save(job)
+                self._push(job)
+            self._jobs[job['id']] = job
+
+    def _push(self, job):
+        heapq.heappush(self._heap, (-job['priority'], next(self._counter), job['id']))
+
+    def submit(self, grid, selected_rules, params, steps, priority=0):
+        """Sprawdza dane zadania (ValueError / TypeError) i dodaje je do kolejki"""
+        if not isinstance(selected_rules, (list, tuple)):
+            raise TypeError("Reguły muszą być listą nazw")
+        unknown = [r for r in selected_rules if r not in RULE_NAMES]
+        if unknown:
+            raise ValueError(f"Nieznane reguły: {unknown}")
+        params = {**DEFAULT_PARAMS, **(params or {})}
+        unknown = [k for k in params if k not in DEFAULT_PARAMS]
+        if unknown:
+            raise ValueError(f"Nieznane parametry: {unknown}")
+        invalid = [k for k, v in params.items()
+                   if isinstance(v, bool) or not isinstance(v, (int, float))]
+        if invalid:
+            raise ValueError(f"Parametry muszą być liczbami: {invalid}")
+        grid = np.asarray(grid)
+        if grid.ndim != 2 or grid.dtype.kind not in 'iu':
+            raise ValueError(f"Grid musi być dwuwymiarową tablicą liczb całkowitych "
+                             f"(jest {grid.ndim}D, {grid.dtype})")
+        steps, priority = int(steps), int(priority)
+        if steps < 0:
+            raise ValueError("Liczba iteracji nie może być ujemna")
+
+        job_id = uuid.uuid4().hex[:12]
+        # Reguły sumują sąsiadów w typie gridu - liczymy jak aplikacja, w int64
+        np.save(self._path(job_id, '_input.npy'), grid.astype(np.int64))
+        job = {
+            'id': job_id,
+            'status': QUEUED,
+            'rules': list(selected_rules),
+            'params': params,
+            'steps': steps,
+            'priority': priority,
+            'progress': 0,
+            'submitted': time.time(),
+            'started': None,
+            'finished': None,
+            'error': None,
+        }
+        with self._cond:
+            self._jobs[job_id] = job
+            self._save(job)
+            self._push(job)
+            self._cond.notify_all()
+        return job_id
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        if job['status'] == RUNNING:
+            job['progress'] = self._progress.get(job_id, 0)
+        return job
+
+    def list(self):
+        with self._cond:
+            ids = list(self._jobs)
+        return sorted((self.get(i) for i in ids), key=lambda j: j['submitted'], reverse=True)
+
+    def cancel(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] == QUEUED:
+                # Wpis w kopcu zostaje - scheduler pominie zadanie o innym statusie
+                job['status'] = CANCELLED
+                job['finished'] = time.time()
+                self._save(job)
+            elif job['status'] == RUNNING:
+                self._cancel[job_id].set()
+        return self.get(job_id)
+
+    def result_path(self, job_id):
+        job = self.get(job_id)
+        if job is None or job['status'] != DONE:
+            return None
+        return self._path(job_id, '.npy')
+
+    def _schedule(self):
+        while True:
+            with self._cond:
+                while not self._closed and (not self._heap or self._running >= self.max_workers):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _, _, job_id = heapq.heappop(self._heap)
+                job = self._jobs[job_id]
+                if job['status'] != QUEUED:
+                    continue
+                job['status'] = RUNNING
+                job['started'] = time.time()
+                self._save(job)
+                self._running += 1
+                self._progress[job_id] = 0
+                self._cancel[job_id] = self._manager.Event()
+
+            future = self._executor.submit(
+                _run_job, self._path(job_id, '_input.npy'), self._path(job_id, '.npy'),
+                job['rules'], job['params'], job['steps'],
+                self._progress, self._cancel[job_id], self._stop, job_id,
+            )
+            future.add_done_callback(lambda f, job_id=job_id: self._finish(job_id, f))
+
+    def _finish(self, job_id, future):
+        with self._cond:
+            job = self._jobs[job_id]
+            try:
+                try:
+                    job['status'] = future.result()
+                except BaseException as e:
+                    job['status'] = FAILED
+                    job['error'] = repr(e)
+                if job['status'] == INTERRUPTED:
+                    # Zatrzymanie serwisu - przy następnym starcie zadanie wróci do kolejki
+                    job['status'] = QUEUED
+                    job['started'] = None
+                    job['progress'] = 0
+                    self._progress.pop(job_id, None)
+                else:
+                    job['progress'] = self._progress.pop(job_id, job['progress'])
+                    job['finished'] = time.time()
+                self._save(job)
+            finally:
+                self._cancel.pop(job_id, None)
+                self._running -= 1
+                self._cond.notify_all()
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._stop.set()
+            self._cond.notify_all()
+        self._executor.shutdown(wait=True)
+        self._manager.shutdown()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    API:
+      POST /jobs                 {"grid": ścieżka | "grid_npy": base64, "rules", "params", "steps", "priority"}
+      GET  /jobs                 lista zadań
+      GET  /jobs/<id>            status i postęp
+      POST /jobs/<id>/cancel     anulowanie
+      GET  /jobs/<id>/result     wynik jako plik .npy
+    """
+    manager = None
+
+    def _send_json(self, data, code=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parts(self):
+        return [p for p in self.path.split('?')[0].split('/') if p]
+
+    def do_GET(self):
+        parts = self._parts()
+        if parts == ['jobs']:
+            return self._send_json(self.manager.list())
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = self.manager.get(parts[1])
+            if job is None:
+                return self._send_json({'error': 'Nie ma takiego zadania'}, 404)
+            return self._send_json(job)
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'result':
+            path = self.manager.result_path(parts[1])
+            if path is None:
+                return self._send_json({'error': 'Brak wyniku'}, 404)
+            with open(path, 'rb') as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self._send_json({'error': 'Nieznany adres'}, 404)
+
+    def do_POST(self):
+        parts = self._parts()
+        if parts == ['jobs']:
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                req = json.loads(self.rfile.read(length) or b'{}')
+                if 'grid_npy' in req:
+                    grid = np.load(io.BytesIO(base64.b64decode(req['grid_npy'])))
+                else:
+                    grid = np.load(req['grid'])
+                job_id = self.manager.submit(grid, req['rules'], req.get('params'),
+                                             req['steps'], req.get('priority', 0))
+            except Exception as e:
+                # Każdy błąd odczytu lub walidacji (także uszkodzony .npy: EOFError,
+                # BadZipFile) to błędne zapytanie - klient zawsze dostaje odpowiedź
+                return self._send_json({'error': str(e) or type(e).__name__}, 400)
+            return self._send_json(self.manager.get(job_id), 201)
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            job = self.manager.cancel(parts[1])
+            if job is None:
+                return self._send_json({'error': 'Nie ma takiego zadania'}, 404)
+            return self._send_json(job)
+        self._send_json({'error': 'Nieznany adres'}, 404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, results_dir='jobs', max_workers=None):
+    manager = JobManager(results_dir, max_workers)
+    handler = type('Handler', (_Handler,), {'manager': manager})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"🚀 Serwis symulacji na http://{host}:{port} "
+          f"({manager.max_workers} procesów, wyniki w '{results_dir}')")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.shutdown()
+
+
+class ServiceClient:
+    """Klient HTTP serwisu symulacji (używany przez main.py i skrypty)"""
+
+    def __init__(self, url=DEFAULT_URL, timeout=5):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, path, data=None):
+        body = None if data is None else json.dumps(data).encode('utf-8')
+        req = urllib.request.Request(self.url + path, data=body,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.read()
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read()).get('error', str(e))) from None
+
+    def available(self):
+        try:
+            self.jobs()
+            return True
+        except (OSError, RuntimeError):
+            return False
+
+    def submit(self, grid, selected_rules, params, steps, priority=0):
+        """grid: ścieżka do .npy po stronie serwisu albo tablica numpy"""
+        data = {'rules': list(selected_rules), 'params': params,
+                'steps': steps, 'priority': priority}
+        if isinstance(grid, np.ndarray):
+            data['grid_npy'] = base64.b64encode(_npy_to_bytes(grid)).decode('ascii')
+        else:
+            data['grid'] = str(grid)
+        return json.loads(self._request('/jobs', data))['id']
+
+    def jobs(self):
+        return json.loads(self._request('/jobs'))
+
+    def status(self, job_id):
+        return json.loads(self._request(f'/jobs/{job_id}'))
+
+    def cancel(self, job_id):
+        return json.loads(self._request(f'/jobs/{job_id}/cancel', {}))
+
+    def result(self, job_id):
+        return np.load(io.BytesIO(self._request(f'/jobs/{job_id}/result')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokalny serwis kolejki symulacji CA")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--results', default='jobs', help="Katalog na wyniki zadań")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Liczba procesów roboczych (domyślnie liczba rdzeni)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.results, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from rules_implementations import RULE_NAMES, DEFAULT_PARAMS, apply_rules
+from parallel_step import apply_rules_banded
+
+
+@pytest.mark.parametrize('shape', [(130, 77), (203, 151), (257, 64)])
+@pytest.mark.parametrize('workers', [2, 3, 5])
+@pytest.mark.parametrize('rules', [[name] for name in RULE_NAMES] + [RULE_NAMES])
+def test_banded_matches_serial(shape, workers, rules):
+    """Wersja na pasach musi dawać dokładnie ten sam krok co apply_rules"""
+    grid = np.random.default_rng(0).integers(0, 8, size=shape)
+    expected = apply_rules(grid, rules, DEFAULT_PARAMS)
+    result = apply_rules_banded(grid, rules, DEFAULT_PARAMS, workers)
+    np.testing.assert_array_equal(result, expected)
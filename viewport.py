@@ -0,0 +1,91 @@
+import numpy as np
+
+from visualization import PALETTE_RGB
+
+
+def _majority(blocks):
+    """Najczęstsza klasa w każdym wierszu (n, 4); remis - pierwsza z kolejności"""
+    counts = (blocks[:, :, None] == blocks[:, None, :]).sum(axis=2)
+    return blocks[np.arange(len(blocks)), counts.argmax(axis=1)]
+
+
+def _children(level, rows, cols):
+    """Wartości 2x2 dzieci dla bloków (rows, cols); brzegi nieparzyste - powielone"""
+    h, w = level.shape
+    r0, c0 = 2 * rows, 2 * cols
+    r1, c1 = np.minimum(r0 + 1, h - 1), np.minimum(c0 + 1, w - 1)
+    return np.stack([level[r0, c0], level[r0, c1], level[r1, c0], level[r1, c1]], axis=1)
+
+
+def _downsample(level):
+    """Kolejny poziom piramidy - klasa większościowa w każdym bloku 2x2"""
+    h, w = level.shape
+    rows, cols = np.indices(((h + 1) // 2, (w + 1) // 2))
+    rows, cols = rows.ravel(), cols.ravel()
+    return _majority(_children(level, rows, cols)).reshape((h + 1) // 2, (w + 1) // 2)
+
+
+class TilePyramid:
+    """
+    Piramida zmniejszonych gridów: poziom 0 to grid, poziom k jest 2^k razy
+    mniejszy (klasa większościowa bloku 2x2 poziomu k-1). Po kroku symulacji
+    przeliczane są tylko bloki nad zmienionymi komórkami.
+    """
+
+    def __init__(self, grid, min_size=64):
+        self.levels = [grid]
+        while max(self.levels[-1].shape) > min_size:
+            self.levels.append(_downsample(self.levels[-1]))
+
+    @property
+    def shape(self):
+        return self.levels[0].shape
+
+    def update(self, new_grid, changed=None):
+        """Podmienia poziom 0 na new_grid i aktualizuje bloki nad zmienionymi komórkami"""
+        if changed is None:
+            changed = np.nonzero(new_grid != self.levels[0])
+        self.levels[0] = new_grid
+        rows, cols = changed
+        for k in range(1, len(self.levels)):
+            if len(rows) == 0:
+                break
+            # Unikalne bloki rodziców na poziomie k
+            w = self.levels[k].shape[1]
+            flat = np.unique((rows // 2) * w + cols // 2)
+            rows, cols = flat // w, flat % w
+            values = _majority(_children(self.levels[k - 1], rows, cols))
+            level = self.levels[k]
+            moved = level[rows, cols] != values
+            level[rows, cols] = values
+            # Wyżej idą tylko bloki, które faktycznie zmieniły klasę
+            rows, cols = rows[moved], cols[moved]
+
+    def render(self, row0, col0, height, width, out_size=1000):
+        """
+        Renderuje widok (row0, col0, height, width) w komórkach poziomu 0
+        do obrazu RGB o dłuższym boku out_size px. Poziom dobierany tak,
+        żeby na piksel przypadała co najwyżej jedna komórka.
+        """
+        scale = max(height, width) / out_size
+        k = int(np.clip(np.ceil(np.log2(max(scale, 1))), 0, len(self.levels) - 1))
+        level = self.levels[k]
+
+        out_h = max(1, round(height / max(scale, 1)))
+        out_w = max(1, round(width / max(scale, 1)))
+        # Indeksy najbliższych komórek poziomu k dla każdego piksela wyjścia
+        r = ((row0 + (np.arange(out_h) + 0.5) * height / out_h) // 2 ** k).astype(int)
+        c = ((col0 + (np.arange(out_w) + 0.5) * width / out_w) // 2 ** k).astype(int)
+        r = np.clip(r, 0, level.shape[0] - 1)
+        c = np.clip(c, 0, level.shape[1] - 1)
+        return PALETTE_RGB[level[np.ix_(r, c)]]
+
+
+def viewport_bounds(shape, zoom, center_row, center_col):
+    """Okno (row0, col0, height, width) dla powiększenia zoom wokół środka (ułamki 0-1)"""
+    rows, cols = shape
+    height = max(1, int(rows / zoom))
+    width = max(1, int(cols / zoom))
+    row0 = int(np.clip(center_row * rows - height / 2, 0, rows - height))
+    col0 = int(np.clip(center_col * cols - width / 2, 0, cols - width))
+    return row0, col0, height, width
@@ -1,28 +1,34 @@
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
+import numpy as np
 import io
 
 
+COLORS = [
+    '#F5F5F5',  # 0: EMPTY
+    '#FFF9C4',  # 1: RES LOW
+    '#FFB74D',  # 2: RES HIGH
+    '#EC407A',  # 3: COMMERCIAL
+    '#AB47BC',  # 4: INDUSTRIAL
+    '#66BB6A',  # 5: PARKS
+    '#42A5F5',  # 6: WATER
+    '#616161',  # 7: ROADS
+]
+
+NAMES = ['Empty', 'Res Low', 'Res High', 'Commercial',
+         'Industrial', 'Parks', 'Water', 'Roads']
+
+# Paleta jako tablica (8, 3) uint8 - indeksowana bezpośrednio klasą komórki
+PALETTE_RGB = np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)] for c in COLORS],
+                       dtype=np.uint8)
+
+
 def create_visualization(grid, iteration_num=0):
     """Tworzy wizualizację gridu"""
-    colors = [
-        '#F5F5F5',  # 0: EMPTY
-        '#FFF9C4',  # 1: RES LOW
-        '#FFB74D',  # 2: RES HIGH
-        '#EC407A',  # 3: COMMERCIAL
-        '#AB47BC',  # 4: INDUSTRIAL
-        '#66BB6A',  # 5: PARKS
-        '#42A5F5',  # 6: WATER
-        '#616161',  # 7: ROADS
-    ]
-    
-    names = ['Empty', 'Res Low', 'Res High', 'Commercial', 
-             'Industrial', 'Parks', 'Water', 'Roads']
-    
-    cmap = ListedColormap(colors)
+    cmap = ListedColormap(COLORS)
     
     fig, ax = plt.subplots(figsize=(10, 10), dpi=100)
-    im = ax.imshow(grid, cmap=cmap, vmin=0, vmax=7, interpolation='bilinear')
+    im = ax.imshow(grid, cmap=cmap, vmin=0, vmax=7, interpolation='nearest')
     
     ax.set_title(f'Iteracja: {iteration_num}', fontsize=16, fontweight='bold')
     ax.set_xlabel('West → East', fontsize=10)
@@ -36,7 +42,7 @@ def create_visualization(grid, iteration_num=0):
     
     cbar = plt.colorbar(im, ax=ax, ticks=range(8), fraction=0.046, pad=0.04)
     cbar.set_label('Typ terenu', fontsize=12, fontweight='bold')
-    cbar.ax.set_yticklabels(names, fontsize=9)
+    cbar.ax.set_yticklabels(NAMES, fontsize=9)
     
     plt.tight_layout()
     
@@ -45,4 +51,16 @@ def create_visualization(grid, iteration_num=0):
     buf.seek(0)
     plt.close(fig)
     
-    return buf
\ No newline at end of file
+    return buf
+
+
+def downscale_grid(grid, factor=1):
+    """Zmniejsza grid co `factor` komórek (bez interpolacji - klasy zostają klasami)"""
+    if factor <= 1:
+        return grid
+    return grid[::factor, ::factor]
+
+
+def grid_to_rgb(grid, factor=1):
+    """Mapuje grid klas na obraz RGB (H, W, 3) uint8 jednym lookupem w palecie"""
+    return PALETTE_RGB[downscale_grid(grid, factor)]